@@ -1,7 +1,9 @@
+from concurrent.futures import ThreadPoolExecutor
 import json
 import logging
 import os
 import re
+import threading
 import time
 from pathlib import Path
 
@@ -11,6 +13,8 @@ try:
 except Exception:  # pragma: no cover - fallback for missing dependency
     yaml = None
 
+from http_session import build_session
+
 logger = logging.getLogger(__name__)
 
 TEXT_MODEL_FORM = "text_model"
@@ -19,6 +23,14 @@ RAG_PIPELINE_MODE = "rag_pipeline"
 _SHARED_REF_PATTERN = re.compile(r"\{\{#rag\.shared\.([A-Za-z0-9_]+)#\}\}")
 _DOC_NAME_ITEM_KEY_PATTERN = re.compile(r"^\[([^\]]+)\]\s")
 
+_DOC_PAGE_SIZE = 100
+_DOC_PAGE_WORKERS = 8
+
+# Dify 没有多文档批量创建接口；复用 keep-alive 连接以摊薄每个文档请求的 TCP/TLS 开销。
+_SESSION = build_session()
+
+_UPLOAD_CANCELLED = object()
+
 
 def _headers(api_key, content_type="application/json"):
     headers = {"Authorization": f"Bearer {api_key}"}
@@ -48,7 +60,7 @@ def check_connection(cfg):
         return {"connected": False, "message": "API Key 显示为掩码值，请重新输入"}
 
     try:
-        resp = requests.get(
+        resp = _SESSION.get(
             f"{base_url}/datasets",
             headers=_headers(api_key, content_type=None),
             params={"page": 1, "limit": 1},
@@ -277,7 +289,7 @@ def _list_datasets(base_url, api_key):
     datasets = []
     page = 1
     while True:
-        resp = requests.get(
+        resp = _SESSION.get(
             f"{base_url}/datasets",
             headers=_headers(api_key, content_type=None),
             params={"page": page, "limit": 100},
@@ -293,7 +305,7 @@ def _list_datasets(base_url, api_key):
 
 
 def _fetch_dataset_detail(base_url, api_key, dataset_id):
-    resp = requests.get(
+    resp = _SESSION.get(
         f"{base_url}/datasets/{dataset_id}",
         headers=_headers(api_key, content_type=None),
         timeout=30,
@@ -330,40 +342,55 @@ def get_dataset_info(cfg, dataset_id):
         }
 
 
-def get_dataset_document_total(cfg, dataset_id):
-    """读取知识库文档总数。失败时返回 None。"""
-    dify_cfg = cfg.get("dify", {})
-    base_url = dify_cfg.get("base_url", "")
-    api_key = dify_cfg.get("api_key", "")
-    try:
-        resp = requests.get(
-            f"{base_url}/datasets/{dataset_id}/documents",
-            headers=_headers(api_key, content_type=None),
-            params={"page": 1, "limit": 1},
-            timeout=30,
-        )
-        resp.raise_for_status()
-        body = resp.json()
+def _fetch_document_page(base_url, api_key, dataset_id, page):
+    resp = _SESSION.get(
+        f"{base_url}/datasets/{dataset_id}/documents",
+        headers=_headers(api_key, content_type=None),
+        params={"page": page, "limit": _DOC_PAGE_SIZE},
+        timeout=30,
+    )
+    resp.raise_for_status()
+    return resp.json()
 
-        total = body.get("total")
-        if isinstance(total, int):
-            return total
-        if isinstance(total, str) and total.isdigit():
-            return int(total)
 
-        data = body.get("data")
-        has_more = body.get("has_more")
-        if isinstance(data, list) and has_more is False and not data:
-            return 0
+def _count_page_docs(body):
+    docs = body.get("data")
+    return len(docs) if isinstance(docs, list) else 0
 
-        logger.warning("读取知识库文档总数返回格式异常（%s）：%s", dataset_id, body)
-    except Exception as exc:
-        logger.warning("读取知识库文档总数失败（%s）：%s", dataset_id, exc)
-    return None
+
+def _merge_document_page(body, names, prefixed_item_keys):
+    """Merge one documents page into the name sets; return unhealthy count."""
+    skipped_unhealthy = 0
+    docs = body.get("data")
+    docs = docs if isinstance(docs, list) else []
+    for doc in docs:
+        if not isinstance(doc, dict):
+            continue
+        name = (doc.get("name") or "").strip()
+        if not name:
+            continue
+
+        # Skip documents that failed indexing or are disabled
+        indexing_status = (doc.get("indexing_status") or "").strip().lower()
+        enabled = doc.get("enabled", True)
+        if indexing_status == "error" or not enabled:
+            skipped_unhealthy += 1
+            continue
+
+        names.add(name)
+        matched = _DOC_NAME_ITEM_KEY_PATTERN.match(name)
+        if matched:
+            prefixed_item_keys.add(matched.group(1))
+    return skipped_unhealthy
 
 
 def get_dataset_document_name_index(cfg, dataset_id):
-    """拉取知识库文档名索引。"""
+    """拉取知识库文档名索引。
+
+    首页同步拉取以获知 total，其余页用有界线程池并发拉取；
+    total 缺失时回退为逐页翻页，并以完整翻页后的文档数作为 total，
+    调用方无需再单独请求文档总数。
+    """
     dify_cfg = cfg.get("dify", {})
     base_url = dify_cfg.get("base_url", "")
     api_key = dify_cfg.get("api_key", "")
@@ -372,50 +399,43 @@ def get_dataset_document_name_index(cfg, dataset_id):
     prefixed_item_keys = set()
     skipped_unhealthy = 0
     total = None
+    docs_seen = 0
     page = 1
 
     try:
-        while True:
-            resp = requests.get(
-                f"{base_url}/datasets/{dataset_id}/documents",
-                headers=_headers(api_key, content_type=None),
-                params={"page": page, "limit": 100},
-                timeout=30,
-            )
-            resp.raise_for_status()
-            body = resp.json()
-
-            if total is None:
-                total_value = body.get("total")
-                if isinstance(total_value, int):
-                    total = total_value
-                elif isinstance(total_value, str) and total_value.isdigit():
-                    total = int(total_value)
-
-            docs = body.get("data")
-            docs = docs if isinstance(docs, list) else []
-            for doc in docs:
-                if not isinstance(doc, dict):
-                    continue
-                name = (doc.get("name") or "").strip()
-                if not name:
-                    continue
-
-                # Skip documents that failed indexing or are disabled
-                indexing_status = (doc.get("indexing_status") or "").strip().lower()
-                enabled = doc.get("enabled", True)
-                if indexing_status == "error" or not enabled:
-                    skipped_unhealthy += 1
-                    continue
-
-                names.add(name)
-                matched = _DOC_NAME_ITEM_KEY_PATTERN.match(name)
-                if matched:
-                    prefixed_item_keys.add(matched.group(1))
-
-            if not body.get("has_more", False):
-                break
+        body = _fetch_document_page(base_url, api_key, dataset_id, page)
+        total_value = body.get("total")
+        if isinstance(total_value, int):
+            total = total_value
+        elif isinstance(total_value, str) and total_value.isdigit():
+            total = int(total_value)
+        skipped_unhealthy += _merge_document_page(body, names, prefixed_item_keys)
+        docs_seen += _count_page_docs(body)
+
+        if body.get("has_more", False) and total is not None:
+            last_page = max(1, -(-total // _DOC_PAGE_SIZE))
+            remaining = list(range(2, last_page + 1))
+            if remaining:
+                with ThreadPoolExecutor(
+                    max_workers=min(_DOC_PAGE_WORKERS, len(remaining))
+                ) as executor:
+                    bodies = list(executor.map(
+                        lambda p: _fetch_document_page(base_url, api_key, dataset_id, p),
+                        remaining,
+                    ))
+                for body in bodies:
+                    skipped_unhealthy += _merge_document_page(body, names, prefixed_item_keys)
+                page = last_page
+
+        # total 缺失，或并发拉取期间知识库有新增文档：继续逐页翻页。
+        while body.get("has_more", False):
             page += 1
+            body = _fetch_document_page(base_url, api_key, dataset_id, page)
+            skipped_unhealthy += _merge_document_page(body, names, prefixed_item_keys)
+            docs_seen += _count_page_docs(body)
+
+        if total is None:
+            total = docs_seen
     except Exception as exc:
         logger.warning("拉取知识库文档名索引失败（%s）：%s", dataset_id, exc)
 
@@ -522,7 +542,7 @@ def _upload_by_text(cfg, dataset_id, doc_name, text, resolved_doc_form):
     if doc_language:
         body["doc_language"] = doc_language
 
-    resp = requests.post(
+    resp = _SESSION.post(
         f"{base_url}/datasets/{dataset_id}/document/create-by-text",
         headers=_headers(api_key),
         json=body,
@@ -557,7 +577,7 @@ def _upload_markdown_as_file(
     files = {"file": (doc_name, text.encode("utf-8"), "text/markdown")}
     data = {"data": json.dumps(payload, ensure_ascii=False)}
 
-    resp = requests.post(
+    resp = _SESSION.post(
         f"{base_url}/datasets/{dataset_id}/document/create-by-file",
         headers=_headers(api_key, content_type=None),
         files=files,
@@ -629,11 +649,33 @@ def _emit_upload_progress(progress_callback, **payload):
     except Exception as exc:
         logger.warning("upload progress callback failed: %s", exc)
 
-def upload_all(cfg, dataset_id, md_results, dataset_info=None, progress_callback=None):
-    """上传全部 Markdown 文本到 Dify。"""
+
+def _resolve_upload_concurrency(cfg):
+    try:
+        value = int(cfg.get("dify", {}).get("upload_concurrency", 1))
+    except (TypeError, ValueError):
+        value = 1
+    return max(1, min(8, value))
+
+
+def upload_all(
+    cfg,
+    dataset_id,
+    md_results,
+    dataset_info=None,
+    progress_callback=None,
+    should_cancel=None,
+):
+    """上传全部 Markdown 文本到 Dify。
+
+    dify.upload_concurrency > 1 时使用有界线程池并发提交；upload_delay 作用于
+    每个 worker 的相邻两次提交之间。进度回调始终串行触发。
+    should_cancel 返回 True 后不再提交新文档，未提交的文档既不计入成功也不计入失败。
+    """
     dify_cfg = cfg.get("dify", {})
     upload_delay = dify_cfg.get("upload_delay", 1)
     configured_doc_form = (dify_cfg.get("doc_form") or "").strip()
+    concurrency = _resolve_upload_concurrency(cfg)
 
     uploaded = []
     failed = []
@@ -655,7 +697,11 @@ def upload_all(cfg, dataset_id, md_results, dataset_info=None, progress_callback
             "当前知识库 doc_form=hierarchical_model。将继续上传 Markdown。"
         )
 
-    for item_key, data in md_results.items():
+    callback_lock = threading.Lock()
+
+    def _submit(item_key, data):
+        if should_cancel is not None and should_cancel():
+            return _UPLOAD_CANCELLED
         batch = upload_document(
             cfg=cfg,
             dataset_id=dataset_id,
@@ -665,27 +711,44 @@ def upload_all(cfg, dataset_id, md_results, dataset_info=None, progress_callback
             doc_form=effective_doc_form,
             runtime_mode=dataset_runtime_mode,
         )
+        with callback_lock:
+            if batch:
+                _emit_upload_progress(
+                    progress_callback,
+                    phase="submit_ok",
+                    item_key=item_key,
+                    batch=batch,
+                    success=True,
+                    message=f"Dify submit accepted: {data['file_name']}",
+                )
+            else:
+                _emit_upload_progress(
+                    progress_callback,
+                    phase="submit_failed",
+                    item_key=item_key,
+                    batch="",
+                    success=False,
+                    message=f"Dify submit failed: {data['file_name']}",
+                )
+        time.sleep(upload_delay)
+        return batch
+
+    items = list(md_results.items())
+    if concurrency <= 1 or len(items) <= 1:
+        outcomes = [_submit(item_key, data) for item_key, data in items]
+    else:
+        max_workers = min(concurrency, len(items))
+        logger.info("Dify 并发上传：workers=%d, docs=%d", max_workers, len(items))
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            outcomes = list(executor.map(lambda kv: _submit(*kv), items))
+
+    for (item_key, _), batch in zip(items, outcomes):
+        if batch is _UPLOAD_CANCELLED:
+            continue
         if batch:
             uploaded.append(item_key)
-            _emit_upload_progress(
-                progress_callback,
-                phase="submit_ok",
-                item_key=item_key,
-                batch=batch,
-                success=True,
-                message=f"Dify submit accepted: {data['file_name']}",
-            )
         else:
             failed.append(item_key)
-            _emit_upload_progress(
-                progress_callback,
-                phase="submit_failed",
-                item_key=item_key,
-                batch="",
-                success=False,
-                message=f"Dify submit failed: {data['file_name']}",
-            )
-        time.sleep(upload_delay)
 
     logger.info("Dify submit: %d 接受, %d 拒绝", len(uploaded), len(failed))
 
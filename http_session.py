@@ -0,0 +1,60 @@
+"""Shared pooled requests.Session factory for the API clients."""
+
+import atexit
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+_sessions = []
+_sessions_lock = threading.Lock()
+
+
+def build_session(
+    pool_connections=16,
+    pool_maxsize=32,
+    retry_methods=("GET", "HEAD"),
+    status_forcelist=None,
+):
+    """Create a keep-alive Session with a tuned connection pool.
+
+    By default only idempotent reads (GET/HEAD) are retried at the transport
+    level; uploads keep their own retry logic so request bodies are never
+    replayed from an exhausted stream. Callers whose POSTs are idempotent
+    (e.g. JSON-RPC reads) may widen retry_methods and pass status_forcelist
+    such as (429, 503); Retry-After is honoured.
+    """
+    session = requests.Session()
+    retry = Retry(
+        total=3,
+        backoff_factor=0.3,
+        allowed_methods=frozenset(retry_methods),
+        status_forcelist=status_forcelist,
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(
+        pool_connections=pool_connections,
+        pool_maxsize=pool_maxsize,
+        max_retries=retry,
+    )
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    with _sessions_lock:
+        _sessions.append(session)
+    return session
+
+
+def close_sessions():
+    """Close every session created by build_session()."""
+    with _sessions_lock:
+        sessions = list(_sessions)
+        _sessions.clear()
+    for session in sessions:
+        try:
+            session.close()
+        except Exception:
+            pass
+
+
+atexit.register(close_sessions)
@@ -1,9 +1,12 @@
 """Markdown post-processing module between MinerU output and Dify upload."""
 
 import base64
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+import functools
+from itertools import repeat
 import json
 import logging
+import multiprocessing
 import os
 import re
 
@@ -125,16 +128,29 @@ def _remove_page_numbers(text):
     return _RE_PAGE_NUMBER.sub("", text)
 
 
-def _remove_watermark(text, patterns):
-    """Remove watermark text by configured regex patterns."""
-    for pat in patterns:
+@functools.lru_cache(maxsize=32)
+def _compile_watermark_patterns(raw_patterns):
+    """Compile comma-separated watermark patterns once per distinct config value.
+
+    Patterns stay separate and in config order, since they are applied one
+    after another and may overlap.
+    """
+    compiled = []
+    for pat in raw_patterns.split(","):
         pat = pat.strip()
         if not pat:
             continue
         try:
-            text = re.sub(pat, "", text)
+            compiled.append(re.compile(pat))
         except re.error as exc:
             logger.warning("Invalid watermark regex skipped '%s': %s", pat, exc)
+    return tuple(compiled)
+
+
+def _remove_watermark(text, patterns):
+    """Remove watermark text by pre-compiled regex patterns."""
+    for rx in patterns:
+        text = rx.sub("", text)
     return text
 
 
@@ -1130,7 +1146,7 @@ def clean_markdown(text, cfg, file_meta=None):
         stats["rules_applied"].append("remove_page_numbers")
 
     if md_cfg.get("remove_watermark", False) and md_cfg.get("watermark_patterns", ""):
-        patterns = md_cfg["watermark_patterns"].split(",")
+        patterns = _compile_watermark_patterns(md_cfg["watermark_patterns"])
         text = _remove_watermark(text, patterns)
         stats["rules_applied"].append("remove_watermark")
 
@@ -1188,26 +1204,7 @@ def clean_all(md_results, cfg):
     }
     cleaned_results = {}
 
-    for key, data in md_results.items():
-        original_text = data.get("text", "")
-        try:
-            cleaned_text, file_stats = clean_markdown(original_text, cfg, file_meta=data)
-        except Exception as exc:
-            logger.warning("Markdown clean failed for '%s', keep original: %s", data.get("file_name", key), exc)
-            cleaned_text = original_text
-            file_stats = {
-                "original_len": len(original_text),
-                "cleaned_len": len(original_text),
-                "image_summary": {
-                    "enabled": bool(image_cfg.get("enabled", True)),
-                    "total_images": 0,
-                    "ai_attempted": 0,
-                    "ai_succeeded": 0,
-                    "ai_failed": 0,
-                    "fallback_used": 0,
-                },
-            }
-
+    for key, data, cleaned_text, file_stats in _iter_cleaned(md_results, cfg):
         total_original += file_stats["original_len"]
         total_cleaned += file_stats["cleaned_len"]
         file_image_stats = file_stats.get("image_summary") or {}
@@ -1233,6 +1230,69 @@ def clean_all(md_results, cfg):
     return cleaned_results, agg
 
 
+def _clean_one(key, data, cfg):
+    """Clean one result; on failure keep the original text."""
+    original_text = data.get("text", "")
+    try:
+        cleaned_text, file_stats = clean_markdown(original_text, cfg, file_meta=data)
+    except Exception as exc:
+        image_cfg = cfg.get("image_summary", {})
+        logger.warning("Markdown clean failed for '%s', keep original: %s", data.get("file_name", key), exc)
+        cleaned_text = original_text
+        file_stats = {
+            "original_len": len(original_text),
+            "cleaned_len": len(original_text),
+            "image_summary": {
+                "enabled": bool(image_cfg.get("enabled", True)),
+                "total_images": 0,
+                "ai_attempted": 0,
+                "ai_succeeded": 0,
+                "ai_failed": 0,
+                "fallback_used": 0,
+            },
+        }
+    return cleaned_text, file_stats
+
+
+def _resolve_process_workers(cfg, file_count):
+    workers = _safe_int(cfg.get("md_clean", {}).get("process_workers", 1), 1)
+    workers = max(1, min(workers, os.cpu_count() or 1, file_count))
+    return workers
+
+
+def _iter_cleaned(md_results, cfg):
+    """Yield (key, data, cleaned_text, file_stats) in md_results order.
+
+    Regex cleaning is CPU-bound and GIL-serialized, so with
+    md_clean.process_workers > 1 documents are cleaned in a spawn-based
+    process pool. Each worker runs its own image-summary thread pool.
+    """
+    items = list(md_results.items())
+    workers = _resolve_process_workers(cfg, len(items))
+    if workers <= 1:
+        for key, data in items:
+            yield (key, data, *_clean_one(key, data, cfg))
+        return
+
+    keys = [key for key, _ in items]
+    datas = [data for _, data in items]
+    chunksize = max(1, len(items) // (workers * 4))
+    try:
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context("spawn"),
+        ) as executor:
+            results = list(executor.map(
+                _clean_one, keys, datas, repeat(cfg), chunksize=chunksize,
+            ))
+    except Exception as exc:
+        logger.warning("Process pool cleaning failed, fallback to sequential: %s", exc)
+        results = [_clean_one(key, data, cfg) for key, data in items]
+
+    for key, data, (cleaned_text, file_stats) in zip(keys, datas, results):
+        yield key, data, cleaned_text, file_stats
+
+
 def _safe_int(value, default_value):
     try:
         return int(value)
@@ -1,22 +1,43 @@
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+import hashlib
 import io
+import json
 import logging
 import os
 import posixpath
 import re
+import struct
 import time
 import zipfile
 
 import requests
+try:
+    from isal import isal_zlib as _fast_zlib
+except Exception:  # pragma: no cover - optional accelerator
+    _fast_zlib = None
+try:
+    import orjson
+except Exception:  # pragma: no cover - optional accelerator
+    orjson = None
+
+from http_session import build_session
 
 logger = logging.getLogger(__name__)
 
 MINERU_BASE_URL = "https://mineru.net/api/v4"
 MINERU_BATCH_SIZE = 200
 MINERU_MAX_FILE_SIZE_BYTES = 200 * 1024 * 1024
-POLL_INTERVAL_MINERU = 30
+POLL_MIN_INTERVAL_MINERU = 3
+POLL_MAX_INTERVAL_MINERU = 30
+POLL_BACKOFF_FACTOR = 1.5
+_NEAR_DONE_RATIO = 0.9
 MINERU_ASSET_OUTPUT_DIR = os.path.join("outputs", "mineru_assets")
+_DIGEST_CHUNK_SIZE = 1024 * 1024
 _IMAGE_EXTENSIONS = {".png", ".jpg", ".jpeg", ".webp", ".bmp", ".gif", ".tif", ".tiff"}
 _MASKED_TOKEN_RE = re.compile(r"^\*+[^\*]{4}$")
+_SESSION = build_session()
+_ZIP_LOCAL_HEADER = struct.Struct("<4s22xHH")
 
 
 def _build_headers(api_token):
@@ -27,6 +48,13 @@ def _build_headers(api_token):
     }
 
 
+def _loads_json_bytes(raw):
+    """Parse a JSON response body straight from bytes (orjson when available)."""
+    if orjson is not None:
+        return orjson.loads(raw)
+    return json.loads(raw)
+
+
 def _validate_api_token(api_token):
     token = (api_token or "").strip()
     if not token:
@@ -51,7 +79,7 @@ def check_connection(cfg):
         return {"connected": False, "message": str(exc)}
 
     try:
-        resp = requests.post(
+        resp = _SESSION.post(
             f"{MINERU_BASE_URL}/file-urls/batch",
             headers=_build_headers(api_token),
             json={"files": [], "model_version": "vlm"},
@@ -94,7 +122,7 @@ def _request_upload_urls(file_entries, api_token, model_version="vlm"):
         (batch_id, file_urls) where file_urls is a list of pre-signed PUT URLs.
     """
     token = _validate_api_token(api_token)
-    resp = requests.post(
+    resp = _SESSION.post(
         f"{MINERU_BASE_URL}/file-urls/batch",
         headers=_build_headers(token),
         json={"files": file_entries, "model_version": model_version},
@@ -121,7 +149,7 @@ def _upload_file(url, file_path, max_retries=3):
     for attempt in range(1, max_retries + 1):
         try:
             with open(file_path, "rb") as f:
-                resp = requests.put(url, data=f, timeout=600)
+                resp = _SESSION.put(url, data=f, timeout=600)
 
             if resp.status_code == 200:
                 return
@@ -227,6 +255,41 @@ def upload_batch(cfg, file_items):
     return batch_id, uploaded_items, failed_items
 
 
+def _resolve_poll_bounds(cfg):
+    mineru_cfg = cfg.get("mineru", {})
+    try:
+        min_s = float(mineru_cfg.get("poll_min_s", POLL_MIN_INTERVAL_MINERU))
+    except (TypeError, ValueError):
+        min_s = POLL_MIN_INTERVAL_MINERU
+    try:
+        max_s = float(mineru_cfg.get("poll_max_s", POLL_MAX_INTERVAL_MINERU))
+    except (TypeError, ValueError):
+        max_s = POLL_MAX_INTERVAL_MINERU
+    min_s = max(1.0, min_s)
+    return min_s, max(min_s, max_s)
+
+
+def _poll_progress_signature(results):
+    """Summarize batch progress so the poller can tell when something moved."""
+    states = []
+    extracted_pages = 0
+    near_done = False
+    for r in results:
+        states.append(r.get("state", "unknown"))
+        progress = r.get("extract_progress") or {}
+        if not isinstance(progress, dict):
+            continue
+        try:
+            done_pages = int(progress.get("extracted_pages") or 0)
+            total_pages = int(progress.get("total_pages") or 0)
+        except (TypeError, ValueError):
+            continue
+        extracted_pages += done_pages
+        if total_pages and r.get("state") == "running" and done_pages >= total_pages * _NEAR_DONE_RATIO:
+            near_done = True
+    return (tuple(sorted(states)), extracted_pages), near_done
+
+
 def poll_batch(cfg, batch_id, expected_count=None, expected_keys=None):
     """Poll MinerU until all tasks in a batch reach a terminal state.
 
@@ -244,9 +307,16 @@ def poll_batch(cfg, batch_id, expected_count=None, expected_keys=None):
 
     Raises:
         TimeoutError: if batch does not finish within poll_timeout_s seconds.
+
+    The poll interval backs off exponentially from poll_min_s to poll_max_s
+    and resets whenever the batch makes progress; a running file that is
+    nearly finished triggers a quick re-poll at poll_min_s.
     """
     api_token = _validate_api_token(cfg["mineru"]["api_token"])
     poll_timeout = cfg["mineru"]["poll_timeout_s"]
+    min_interval, max_interval = _resolve_poll_bounds(cfg)
+    attempt = 0
+    last_signature = None
 
     start = time.time()
     expected_keys_set = set(expected_keys) if expected_keys else None
@@ -257,18 +327,19 @@ def poll_batch(cfg, batch_id, expected_count=None, expected_keys=None):
                 f"Batch {batch_id} did not finish within {poll_timeout}s"
             )
 
-        resp = requests.get(
+        resp = _SESSION.get(
             f"{MINERU_BASE_URL}/extract-results/batch/{batch_id}",
             headers={"Authorization": f"Bearer {api_token}"},
             timeout=30,
         )
         resp.raise_for_status()
-        data = resp.json().get("data", {})
+        data = _loads_json_bytes(resp.content).get("data", {})
         results = data.get("extract_result", [])
 
         if not results:
             logger.warning("批次 %s：暂无结果", batch_id)
-            time.sleep(POLL_INTERVAL_MINERU)
+            time.sleep(min(max_interval, min_interval * POLL_BACKOFF_FACTOR ** attempt))
+            attempt += 1
             continue
 
         terminal = {"done", "failed"}
@@ -299,7 +370,16 @@ def poll_batch(cfg, batch_id, expected_count=None, expected_keys=None):
         if all(r.get("state") in terminal for r in results):
             return results
 
-        time.sleep(POLL_INTERVAL_MINERU)
+        signature, near_done = _poll_progress_signature(results)
+        if signature != last_signature:
+            last_signature = signature
+            attempt = 0
+        if near_done:
+            interval = min_interval
+        else:
+            interval = min(max_interval, min_interval * POLL_BACKOFF_FACTOR ** attempt)
+            attempt += 1
+        time.sleep(interval)
 
 
 def download_markdown(cfg, results):
@@ -333,7 +413,7 @@ def download_markdown(cfg, results):
             continue
 
         try:
-            zip_resp = requests.get(zip_url, timeout=120)
+            zip_resp = _SESSION.get(zip_url, timeout=120)
             zip_resp.raise_for_status()
         except Exception as exc:
             failures[data_id] = f"zip download error: {exc}"
@@ -359,22 +439,25 @@ def _extract_md_and_assets_from_zip(content_bytes, cfg, data_id):
     """Extract markdown and image assets from a zip archive."""
     try:
         with zipfile.ZipFile(io.BytesIO(content_bytes)) as zf:
-            file_names = [
-                name for name in zf.namelist()
-                if name and not name.endswith("/")
-            ]
-            md_name = next(
-                (name for name in file_names if name.lower().endswith(".md")),
-                None,
-            )
-            if not md_name:
+            md_info = None
+            image_infos = []
+            for info in zf.infolist():
+                name = info.filename
+                if not name or info.is_dir():
+                    continue
+                if md_info is None and name.lower().endswith(".md"):
+                    md_info = info
+                elif _is_image_path(name):
+                    image_infos.append(info)
+
+            if md_info is None:
                 return None
 
-            md_text = zf.read(md_name).decode("utf-8", errors="replace")
+            md_text = _read_zip_member(zf, md_info).decode("utf-8", errors="replace")
             image_assets = _extract_image_assets(
                 zf=zf,
-                file_names=file_names,
-                md_name=md_name,
+                md_info=md_info,
+                image_infos=image_infos,
                 cfg=cfg,
                 data_id=data_id,
             )
@@ -388,10 +471,39 @@ def _extract_md_and_assets_from_zip(content_bytes, cfg, data_id):
     return None
 
 
-def _extract_image_assets(zf, file_names, md_name, cfg, data_id):
+def _read_zip_member(zf, info):
+    """Read one zip entry, inflating deflated entries with ISA-L when available.
+
+    The accelerator is used locally rather than patched into zipfile. Stored or
+    encrypted entries, and any header/size/CRC mismatch, fall back to zf.read.
+    """
+    if (
+        _fast_zlib is None
+        or info.compress_type != zipfile.ZIP_DEFLATED
+        or info.flag_bits & 0x1
+    ):
+        return zf.read(info)
+    try:
+        zf.fp.seek(info.header_offset)
+        signature, name_len, extra_len = _ZIP_LOCAL_HEADER.unpack(
+            zf.fp.read(_ZIP_LOCAL_HEADER.size)
+        )
+        if signature != b"PK\x03\x04":
+            return zf.read(info)
+        zf.fp.seek(name_len + extra_len, os.SEEK_CUR)
+        inflater = _fast_zlib.decompressobj(-15)
+        data = inflater.decompress(zf.fp.read(info.compress_size)) + inflater.flush()
+    except Exception as exc:
+        logger.debug("fast inflate failed for %s, falling back: %s", info.filename, exc)
+        return zf.read(info)
+    if len(data) != info.file_size or _fast_zlib.crc32(data) != info.CRC:
+        return zf.read(info)
+    return data
+
+
+def _extract_image_assets(zf, md_info, image_infos, cfg, data_id):
     """Persist image files and return metadata used for markdown rewrite."""
-    image_names = [name for name in file_names if _is_image_path(name)]
-    if not image_names:
+    if not image_infos:
         return []
 
     asset_root = _resolve_asset_output_dir(cfg)
@@ -399,17 +511,18 @@ def _extract_image_assets(zf, file_names, md_name, cfg, data_id):
     target_root = os.path.abspath(os.path.join(asset_root, safe_data_id))
     os.makedirs(target_root, exist_ok=True)
 
-    md_dir = posixpath.dirname(md_name)
+    md_dir = posixpath.dirname(md_info.filename)
     assets = []
 
-    for name in image_names:
+    for info in image_infos:
+        name = info.filename
         try:
             relative_name = _normalize_relative_zip_path(name)
             abs_path = _safe_join(target_root, relative_name)
             os.makedirs(os.path.dirname(abs_path), exist_ok=True)
 
-            with zf.open(name) as src, open(abs_path, "wb") as dst:
-                dst.write(src.read())
+            with open(abs_path, "wb") as dst:
+                dst.write(_read_zip_member(zf, info))
 
             link_path = posixpath.relpath(name, md_dir or ".").replace("\\", "/")
             assets.append(
@@ -474,9 +587,149 @@ def _sanitize_path_token(text):
     return "".join(cleaned).strip("._") or "unknown"
 
 
+def _run_batch(cfg, batch, batch_num, total_batches):
+    """Upload, poll and download a single batch.
+
+    Returns:
+        (successes, failures) for this batch; never raises.
+    """
+    logger.info(
+        "批次 %d/%d：文件数 %d", batch_num, total_batches, len(batch)
+    )
+    successes = {}
+    failures = {}
+
+    try:
+        batch_id, uploaded, upload_failed = upload_batch(cfg, batch)
+    except Exception as exc:
+        logger.error("批次 %d 初始化失败：%s", batch_num, exc)
+        for path, key in batch:
+            failures[key] = f"upload error: {exc}"
+        return successes, failures
+
+    for key, err in upload_failed:
+        failures[key] = f"upload error: {err}"
+
+    if not uploaded:
+        logger.warning(
+            "批次 %d：全部上传失败，跳过轮询", batch_num,
+        )
+        return successes, failures
+
+    try:
+        expected_keys = [key for _, key in uploaded]
+        results = poll_batch(
+            cfg,
+            batch_id,
+            expected_count=len(uploaded),
+            expected_keys=expected_keys,
+        )
+        batch_successes, batch_failures = download_markdown(cfg, results)
+    except Exception as exc:
+        logger.error("批次 %d 轮询/下载失败：%s", batch_num, exc)
+        for _, key in uploaded:
+            failures[key] = f"poll/download error: {exc}"
+        return successes, failures
+
+    successes.update(batch_successes)
+    failures.update(batch_failures)
+
+    logger.info(
+        "批次 %d 完成：成功 %d，失败 %d",
+        batch_num,
+        len(batch_successes),
+        len(batch_failures),
+    )
+    return successes, failures
+
+
+def _resolve_batch_parallelism(cfg):
+    try:
+        value = int(cfg.get("mineru", {}).get("batch_parallelism", 3))
+    except (TypeError, ValueError):
+        value = 3
+    return max(1, min(10, value))
+
+
+def _file_digest(file_path):
+    """Return the SHA-256 hex digest of a file, read in 1 MiB chunks."""
+    h = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(_DIGEST_CHUNK_SIZE), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _dedupe_by_content(file_map):
+    """Group files with identical bytes so each distinct file is parsed once.
+
+    Files are bucketed by size first; only files whose size collides with
+    another file are hashed, so a library without duplicates is never read.
+
+    Returns:
+        (unique_map, duplicates) where unique_map = {file_path: task_key}
+        holds one representative per digest and duplicates =
+        {task_key: (representative_key, file_path)} for the rest.
+        Files that cannot be sized or hashed are kept as their own representative.
+    """
+    sizes = {}
+    for path in file_map:
+        try:
+            sizes[path] = os.path.getsize(path)
+        except OSError as exc:
+            logger.warning("读取文件大小失败：%s，错误=%s", os.path.basename(path), exc)
+    size_counts = Counter(sizes.values())
+
+    unique_map = {}
+    duplicates = {}
+    key_by_digest = {}
+
+    for path, key in file_map.items():
+        size = sizes.get(path)
+        if size is None or size_counts[size] < 2:
+            unique_map[path] = key
+            continue
+        try:
+            digest = (size, _file_digest(path))
+        except OSError as exc:
+            logger.warning("计算文件摘要失败：%s，错误=%s", os.path.basename(path), exc)
+            unique_map[path] = key
+            continue
+
+        rep_key = key_by_digest.get(digest)
+        if rep_key is None:
+            key_by_digest[digest] = key
+            unique_map[path] = key
+        else:
+            duplicates[key] = (rep_key, path)
+
+    if duplicates:
+        logger.info("内容重复文件 %d 个，将复用首个文件的解析结果", len(duplicates))
+    return unique_map, duplicates
+
+
+def _fan_out_duplicates(duplicates, all_successes, all_failures):
+    """Copy each representative's result to the task keys that share its bytes."""
+    for key, (rep_key, path) in duplicates.items():
+        if rep_key in all_successes:
+            result = dict(all_successes[rep_key])
+            result["file_name"] = os.path.basename(path)
+            result["image_assets"] = list(result.get("image_assets") or [])
+            all_successes[key] = result
+        elif rep_key in all_failures:
+            all_failures[key] = all_failures[rep_key]
+        else:
+            all_failures[key] = "duplicate of unprocessed file"
+
+
 def process_files(cfg, file_map):
     """Upload files in batches, poll results, and download markdown.
 
+    Batches run concurrently (bounded by cfg["mineru"]["batch_parallelism"])
+    so that one batch's long poll wait overlaps with the others. Files with
+    identical content are uploaded once and the result is shared by every
+    task key pointing at them.
+
     Args:
         cfg: configuration dict with cfg["mineru"]["api_token"] and
             cfg["mineru"]["poll_timeout_s"].
@@ -487,59 +740,41 @@ def process_files(cfg, file_map):
             all_successes = {task_key: {"text": md, "file_name": name}}
             all_failures  = {task_key: error_msg}
     """
-    items = list(file_map.items())
+    unique_map, duplicates = _dedupe_by_content(file_map)
+    items = list(unique_map.items())
     all_successes = {}
     all_failures = {}
 
-    for start in range(0, len(items), MINERU_BATCH_SIZE):
-        batch = items[start : start + MINERU_BATCH_SIZE]
-        batch_num = start // MINERU_BATCH_SIZE + 1
-        total_batches = (len(items) + MINERU_BATCH_SIZE - 1) // MINERU_BATCH_SIZE
-
-        logger.info(
-            "批次 %d/%d：文件数 %d", batch_num, total_batches, len(batch)
-        )
-
-        try:
-            batch_id, uploaded, upload_failed = upload_batch(cfg, batch)
-        except Exception as exc:
-            logger.error("批次 %d 初始化失败：%s", batch_num, exc)
-            for path, key in batch:
-                all_failures[key] = f"upload error: {exc}"
-            continue
-
-        for key, err in upload_failed:
-            all_failures[key] = f"upload error: {err}"
-
-        if not uploaded:
-            logger.warning(
-                "批次 %d：全部上传失败，跳过轮询", batch_num,
-            )
-            continue
-
-        try:
-            expected_keys = [key for _, key in uploaded]
-            results = poll_batch(
-                cfg,
-                batch_id,
-                expected_count=len(uploaded),
-                expected_keys=expected_keys,
-            )
-            successes, failures = download_markdown(cfg, results)
-        except Exception as exc:
-            logger.error("批次 %d 轮询/下载失败：%s", batch_num, exc)
-            for _, key in uploaded:
-                all_failures[key] = f"poll/download error: {exc}"
-            continue
-
-        all_successes.update(successes)
-        all_failures.update(failures)
-
-        logger.info(
-            "批次 %d 完成：成功 %d，失败 %d",
-            batch_num,
-            len(successes),
-            len(failures),
-        )
-
+    batches = [
+        items[start : start + MINERU_BATCH_SIZE]
+        for start in range(0, len(items), MINERU_BATCH_SIZE)
+    ]
+    total_batches = len(batches)
+    parallelism = _resolve_batch_parallelism(cfg)
+
+    if parallelism <= 1 or total_batches <= 1:
+        for idx, batch in enumerate(batches, start=1):
+            successes, failures = _run_batch(cfg, batch, idx, total_batches)
+            all_successes.update(successes)
+            all_failures.update(failures)
+        _fan_out_duplicates(duplicates, all_successes, all_failures)
+        return all_successes, all_failures
+
+    max_workers = min(parallelism, total_batches)
+    logger.info(
+        "MinerU batch parallel enabled: workers=%d, batches=%d",
+        max_workers,
+        total_batches,
+    )
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = [
+            executor.submit(_run_batch, cfg, batch, idx, total_batches)
+            for idx, batch in enumerate(batches, start=1)
+        ]
+        for future in futures:
+            successes, failures = future.result()
+            all_successes.update(successes)
+            all_failures.update(failures)
+
+    _fan_out_duplicates(duplicates, all_successes, all_failures)
     return all_successes, all_failures
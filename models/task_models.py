@@ -1,9 +1,14 @@
 """任务数据模型 — Task / FileState / Event 定义。"""
 
+import os
 import time
-import uuid
+from collections import deque
 from dataclasses import dataclass, field
 from enum import Enum
+from operator import attrgetter
+
+# 单任务事件日志上限；超出后最早的事件被淘汰，seq 仍持续递增。
+EVENT_LOG_CAP = 5000
 
 
 class TaskStatus(str, Enum):
@@ -34,7 +39,16 @@ class FileStatus(str, Enum):
     SKIPPED = "skipped"
 
 
-@dataclass
+# 枚举 -> 字符串值的缓存，避免序列化热路径上的 .value 描述符查找。
+_TASK_STATUS_V = {m: m.value for m in TaskStatus}
+_STAGE_V = {m: m.value for m in Stage}
+_FILE_STATUS_V = {m: m.value for m in FileStatus}
+
+_get_file_fields = attrgetter("filename", "status", "stage", "error", "progress")
+_get_event_fields = attrgetter("seq", "ts", "level", "stage", "event", "message")
+
+
+@dataclass(slots=True)
 class FileState:
     filename: str
     status: FileStatus = FileStatus.PENDING
@@ -43,38 +57,40 @@ class FileState:
     progress: float = 0.0
 
     def to_dict(self) -> dict:
+        filename, status, stage, error, progress = _get_file_fields(self)
         return {
-            "filename": self.filename,
-            "status": self.status.value,
-            "stage": self.stage.value,
-            "error": self.error,
-            "progress": self.progress,
+            "filename": filename,
+            "status": _FILE_STATUS_V[status],
+            "stage": _STAGE_V[stage],
+            "error": error,
+            "progress": progress,
         }
 
 
-@dataclass
+@dataclass(slots=True)
 class Event:
     seq: int
-    ts: float
+    ts: int  # time.time_ns()；序列化时换算为秒
     level: str
     stage: str
     event: str
     message: str
 
     def to_dict(self) -> dict:
+        seq, ts, level, stage, event, message = _get_event_fields(self)
         return {
-            "seq": self.seq,
-            "ts": self.ts,
-            "level": self.level,
-            "stage": self.stage,
-            "event": self.event,
-            "message": self.message,
+            "seq": seq,
+            "ts": ts / 1e9,
+            "level": level,
+            "stage": stage,
+            "event": event,
+            "message": message,
         }
 
 
-@dataclass
+@dataclass(slots=True)
 class Task:
-    task_id: str = field(default_factory=lambda: uuid.uuid4().hex[:12])
+    task_id: str = field(default_factory=lambda: os.urandom(6).hex())
     status: TaskStatus = TaskStatus.QUEUED
     stage: Stage = Stage.INIT
     created_at: float = field(default_factory=time.time)
@@ -84,31 +100,63 @@ class Task:
     config_snapshot: dict = field(default_factory=dict)
     config_version: int = 0
     files: list[FileState] = field(default_factory=list)
-    events: list[Event] = field(default_factory=list)
+    events: deque[Event] = field(default_factory=lambda: deque(maxlen=EVENT_LOG_CAP))
     runtime_stats: dict = field(default_factory=dict)
     error: str = ""
     _seq_counter: int = field(default=0, repr=False)
 
-    def add_event(
-        self, level: str, stage: str, event: str, message: str
-    ) -> Event:
-        self._seq_counter += 1
-        evt = Event(
-            seq=self._seq_counter,
-            ts=time.time(),
-            level=level,
-            stage=stage,
-            event=event,
-            message=message,
-        )
+    def __post_init__(self):
+        if not isinstance(self.runtime_stats, dict):
+            self.runtime_stats = dict(self.runtime_stats or {})
+
+    def add_file(self, filename: str) -> FileState:
+        """追加一个文件。"""
+        fs = FileState(filename=filename)
+        self.files.append(fs)
+        return fs
+
+    def add_files(self, filenames) -> list[FileState]:
+        """批量追加文件，一次 extend。"""
+        new_files = [FileState(filename=name) for name in filenames]
+        self.files.extend(new_files)
+        return new_files
+
+    def set_file_status(
+        self,
+        fs: FileState,
+        status: FileStatus,
+        stage: Stage | None = None,
+        error: str | None = None,
+    ):
+        """更新文件状态，可同时更新阶段与错误信息。"""
+        fs.status = status
+        if stage is not None:
+            fs.stage = stage
+        if error is not None:
+            fs.error = error
+
+    def add_event(self, level: str, stage: str, event: str, message: str) -> Event:
+        seq = self._seq_counter + 1
+        self._seq_counter = seq
+        evt = Event(seq, time.time_ns(), level, stage, event, message)
         self.events.append(evt)
         return evt
 
+    def count_files(self, status: FileStatus) -> int:
+        """返回处于指定状态的文件数（按当前 FileState 现算，不依赖缓存计数）。"""
+        return sum(1 for f in self.files if f.status is status)
+
     def summary(self) -> dict:
         total = len(self.files)
-        succeeded = sum(1 for f in self.files if f.status == FileStatus.SUCCEEDED)
-        failed = sum(1 for f in self.files if f.status == FileStatus.FAILED)
-        skipped = sum(1 for f in self.files if f.status == FileStatus.SKIPPED)
+        succeeded = failed = skipped = 0
+        for f in self.files:
+            status = f.status
+            if status is FileStatus.SUCCEEDED:
+                succeeded += 1
+            elif status is FileStatus.FAILED:
+                failed += 1
+            elif status is FileStatus.SKIPPED:
+                skipped += 1
         pending = total - succeeded - failed - skipped
         stats = {
             "total": total,
@@ -117,12 +165,12 @@ class Task:
             "skipped": skipped,
             "pending": pending,
         }
-        if isinstance(self.runtime_stats, dict) and self.runtime_stats:
+        if self.runtime_stats:
             stats.update(self.runtime_stats)
         return {
             "task_id": self.task_id,
-            "status": self.status.value,
-            "stage": self.stage.value,
+            "status": _TASK_STATUS_V[self.status],
+            "stage": _STAGE_V[self.stage],
             "created_at": self.created_at,
             "started_at": self.started_at,
             "finished_at": self.finished_at,
@@ -134,5 +182,18 @@ class Task:
 
     def detail(self) -> dict:
         d = self.summary()
-        d["files"] = [f.to_dict() for f in self.files]
+        to_dict = FileState.to_dict
+        d["files"] = [to_dict(f) for f in self.files]
+        return d
+
+    def iter_file_dicts(self):
+        """逐个产出文件状态字典，避免一次性构建完整列表。"""
+        to_dict = FileState.to_dict
+        for f in self.files:
+            yield to_dict(f)
+
+    def detail_stream(self) -> dict:
+        """同 detail()，但 "files" 为生成器，需配合流式 JSON 编码使用。"""
+        d = self.summary()
+        d["files"] = self.iter_file_dicts()
         return d
@@ -1,17 +1,25 @@
 """配置 schema 定义与校验。"""
 
+import sys
+
 CONFIG_SCHEMA = {
     "zotero": {
         "mcp_url": {"type": "str", "default": "http://127.0.0.1:23120/mcp", "label": "MCP 连接地址", "sensitive": False},
         "collection_keys": {"type": "str", "default": "", "label": "分组 Key（逗号分隔）", "sensitive": False},
         "collection_recursive": {"type": "bool", "default": True, "label": "递归子分组", "sensitive": False},
         "collection_page_size": {"type": "int", "default": 50, "min": 1, "max": 500, "label": "分页大小", "sensitive": False},
+        "detail_concurrency": {"type": "int", "default": 4, "min": 1, "max": 16, "label": "附件查询并发数", "sensitive": False},
+        "collections_cache_ttl_s": {"type": "int", "default": 60, "min": 0, "max": 3600, "label": "分组列表缓存（秒）", "sensitive": False},
+        "rps": {"type": "float", "default": 0, "min": 0, "max": 100, "label": "MCP 请求限速（次/秒）", "sensitive": False},
     },
     "mineru": {
         "api_token": {"type": "str", "default": "", "label": "API Token", "sensitive": True},
         "model_version": {"type": "select", "default": "vlm", "options": ["vlm", "doc"], "label": "解析模型版本", "sensitive": False},
         "poll_timeout_s": {"type": "int", "default": 7200, "min": 60, "max": 86400, "label": "轮询超时（秒）", "sensitive": False},
+        "poll_min_s": {"type": "int", "default": 3, "min": 1, "max": 300, "label": "最小轮询间隔（秒）", "sensitive": False},
+        "poll_max_s": {"type": "int", "default": 30, "min": 1, "max": 600, "label": "最大轮询间隔（秒）", "sensitive": False},
         "asset_output_dir": {"type": "str", "default": "outputs/mineru_assets", "label": "图片资产输出目录", "sensitive": False},
+        "batch_parallelism": {"type": "int", "default": 3, "min": 1, "max": 10, "label": "批次并发数", "sensitive": False},
     },
     "dify": {
         "api_key": {"type": "str", "default": "", "label": "Dataset API Key", "sensitive": True},
@@ -31,6 +39,7 @@ CONFIG_SCHEMA = {
         "doc_form": {"type": "str", "default": "", "label": "文档形式", "sensitive": False},
         "doc_language": {"type": "str", "default": "", "label": "文档语言", "sensitive": False},
         "upload_delay": {"type": "int", "default": 1, "min": 0, "max": 30, "label": "上传间隔（秒）", "sensitive": False},
+        "upload_concurrency": {"type": "int", "default": 1, "min": 1, "max": 8, "label": "上传并发数", "sensitive": False},
     },
     "md_clean": {
         "enabled": {"type": "bool", "default": True, "label": "启用清洗", "sensitive": False},
@@ -41,6 +50,7 @@ CONFIG_SCHEMA = {
         "remove_page_numbers": {"type": "bool", "default": False, "label": "移除页码", "sensitive": False},
         "remove_watermark": {"type": "bool", "default": False, "label": "移除水印", "sensitive": False},
         "watermark_patterns": {"type": "str", "default": "", "label": "水印正则（逗号分隔）", "sensitive": False},
+        "process_workers": {"type": "int", "default": 1, "min": 1, "max": 32, "label": "清洗进程数", "sensitive": False},
     },
     "image_summary": {
         "enabled": {"type": "bool", "default": True, "label": "启用图摘要回写", "sensitive": False},
@@ -135,71 +145,138 @@ ENV_KEY_MAP = {
 }
 
 
+# 默认值均为不可变的原始类型，按分类浅拷贝即可保证调用方之间互不影响。
+_DEFAULTS_TEMPLATE = {
+    category: {key: spec["default"] for key, spec in fields.items()}
+    for category, fields in CONFIG_SCHEMA.items()
+}
+
+
 def build_defaults():
     """根据 schema 构建完整默认配置。"""
-    defaults = {}
-    for category, fields in CONFIG_SCHEMA.items():
-        defaults[category] = {}
-        for key, spec in fields.items():
-            defaults[category][key] = spec["default"]
-    return defaults
-
-
-def _coerce_value(value, spec):
-    """将输入值转换为 schema 定义的类型。"""
-    field_type = spec["type"]
-    if value is None or value == "":
-        return spec["default"]
-
-    if field_type == "bool":
-        if isinstance(value, bool):
-            return value
-        return str(value).strip().lower() in ("true", "1", "yes", "on")
-
-    if field_type == "int":
-        try:
-            v = int(value)
-            if "min" in spec:
-                v = max(spec["min"], v)
-            if "max" in spec:
-                v = min(spec["max"], v)
-            return v
-        except (ValueError, TypeError):
-            return spec["default"]
-
-    if field_type == "float":
-        try:
-            v = float(value)
-            if "min" in spec:
-                v = max(spec["min"], v)
-            if "max" in spec:
-                v = min(spec["max"], v)
-            return v
-        except (ValueError, TypeError):
-            return spec["default"]
-
-    if field_type == "select":
-        s = str(value).strip()
-        if s in spec.get("options", []):
-            return s
-        return spec["default"]
+    return {category: dict(values) for category, values in _DEFAULTS_TEMPLATE.items()}
+
+
+def _coerce_bool(value, default, mn, mx, options):
+    if isinstance(value, bool):
+        return value
+    return str(value).strip().lower() in ("true", "1", "yes", "on")
+
+
+def _coerce_int(value, default, mn, mx, options):
+    try:
+        v = int(value)
+    except (ValueError, TypeError):
+        return default
+    if mn is not None:
+        v = max(mn, v)
+    if mx is not None:
+        v = min(mx, v)
+    return v
 
+
+def _coerce_float(value, default, mn, mx, options):
+    try:
+        v = float(value)
+    except (ValueError, TypeError):
+        return default
+    if mn is not None:
+        v = max(mn, v)
+    if mx is not None:
+        v = min(mx, v)
+    return v
+
+
+def _coerce_select(value, default, mn, mx, options):
+    # options 为 {驻留字符串: 自身}：命中时返回 schema 中的驻留对象，而不是新分配的输入串，
+    # 且不必对任意用户输入调用 sys.intern。
+    return options.get(str(value).strip(), default)
+
+
+def _coerce_str(value, default, mn, mx, options):
     return str(value)
 
 
+_COERCERS = {
+    "bool": _coerce_bool,
+    "int": _coerce_int,
+    "float": _coerce_float,
+    "select": _coerce_select,
+    "str": _coerce_str,
+}
+
+# 导入时展平 schema：{category: ((key, coercer, default, min, max, options, sensitive), ...)}，
+# 其中 options 为驻留字符串到自身的映射。校验/脱敏热路径只做元组解包并直接调用对应类型的转换函数。
+_FLAT_SCHEMA = {
+    category: tuple(
+        (
+            key,
+            _COERCERS.get(spec["type"], _coerce_str),
+            spec["default"],
+            spec.get("min"),
+            spec.get("max"),
+            {o: o for o in map(sys.intern, map(str, spec.get("options", ())))},
+            bool(spec.get("sensitive", False)),
+        )
+        for key, spec in fields.items()
+    )
+    for category, fields in CONFIG_SCHEMA.items()
+}
+
+
 def validate_and_coerce(data):
     """校验并修正配置数据，返回合法化后的配置。"""
     result = build_defaults()
     if not isinstance(data, dict):
         return result
 
-    for category, fields in CONFIG_SCHEMA.items():
+    for category, descriptors in _FLAT_SCHEMA.items():
         cat_data = data.get(category, {})
         if not isinstance(cat_data, dict):
             continue
-        for key, spec in fields.items():
-            if key in cat_data:
-                result[category][key] = _coerce_value(cat_data[key], spec)
+        cat_result = result[category]
+        for key, coerce, default, mn, mx, options, _sensitive in descriptors:
+            if key not in cat_data:
+                continue
+            value = cat_data[key]
+            if value is None or value == "":
+                cat_result[key] = default
+            else:
+                cat_result[key] = coerce(value, default, mn, mx, options)
+
+    return result
+
+
+_FLAT_INDEX = {
+    category: {descriptor[0]: descriptor for descriptor in descriptors}
+    for category, descriptors in _FLAT_SCHEMA.items()
+}
+
+
+def validate_patch(validated, patch):
+    """在已校验配置上合入局部修改，仅对 patch 中出现的字段做类型转换。
+
+    validated 必须是 validate_and_coerce 的输出；未修改的分类与字段原样沿用，
+    不再整表重跑 schema。返回新字典，不修改入参。
+    """
+    result = {category: dict(values) for category, values in validated.items()}
+    if not isinstance(patch, dict):
+        return result
+
+    for category, fields in patch.items():
+        index = _FLAT_INDEX.get(category)
+        if index is None or not isinstance(fields, dict):
+            continue
+        cat_result = result.setdefault(category, {})
+        for key, value in fields.items():
+            descriptor = index.get(key)
+            if descriptor is None:
+                continue
+            _key, coerce, default, mn, mx, options, _sensitive = descriptor
+            if value is None or value == "":
+                cat_result[key] = default
+            else:
+                cat_result[key] = coerce(value, default, mn, mx, options)
 
     return result
 
@@ -207,13 +284,13 @@ def validate_and_coerce(data):
 def mask_sensitive(data):
     """脱敏敏感字段，仅保留末 4 位。"""
     masked = {}
-    for category, fields in CONFIG_SCHEMA.items():
-        masked[category] = {}
+    for category, descriptors in _FLAT_SCHEMA.items():
+        cat_masked = masked[category] = {}
         cat_data = data.get(category, {})
-        for key, spec in fields.items():
-            value = cat_data.get(key, spec["default"])
-            if spec.get("sensitive") and isinstance(value, str) and len(value) > 4:
-                masked[category][key] = "*" * (len(value) - 4) + value[-4:]
+        for key, _coerce, default, _mn, _mx, _options, sensitive in descriptors:
+            value = cat_data.get(key, default)
+            if sensitive and isinstance(value, str) and len(value) > 4:
+                cat_masked[key] = "*" * (len(value) - 4) + value[-4:]
             else:
-                masked[category][key] = value
+                cat_masked[key] = value
     return masked
@@ -1,19 +1,29 @@
 """Pipeline runner executed in background thread."""
 from __future__ import annotations
 
-from collections import defaultdict
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
 import logging
 import os
 import threading
 import time
 
+from dify_client import (
+    get_dataset_document_name_index,
+    get_dataset_info,
+    get_or_create_dataset,
+    upload_all,
+)
+from md_cleaner import clean_all
+from mineru_client import process_files
 from models.task_models import (
-    FileState,
     FileStatus,
     Stage,
     Task,
     TaskStatus,
 )
+from splitter import smart_split_all, split_documents_for_upload
+from zotero_client import check_connection, collect_files
 
 logger = logging.getLogger(__name__)
 
@@ -28,37 +38,28 @@ def run_pipeline(task: Task, cancel: threading.Event, skip_files: set = None):
     task.stage = Stage.INIT
     task.add_event("info", "init", "task_started", "pipeline started")
 
-    def _check_cancel():
-        if cancel.is_set():
-            raise _CancelledError("task cancelled")
+    is_cancelled = cancel.is_set
 
     try:
-        _check_cancel()
+        if is_cancelled():
+            raise _CancelledError("task cancelled")
 
         # ---- Stage: Zotero Collect ----
         task.stage = Stage.ZOTERO_COLLECT
         task.add_event("info", "zotero_collect", "stage_enter", "collecting Zotero attachments")
 
-        from zotero_client import check_connection, collect_files
-
         if not check_connection(cfg):
             raise RuntimeError("cannot connect Zotero MCP service")
 
-        from dify_client import (
-            get_or_create_dataset,
-            get_dataset_info,
-            get_dataset_document_name_index,
-            get_dataset_document_total,
-        )
-
         dataset_id = get_or_create_dataset(cfg)
-        dataset_info = get_dataset_info(cfg, dataset_id)
-        remote_name_index = get_dataset_document_name_index(cfg, dataset_id)
+        # Dataset detail and document index are independent requests; fetch them together.
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            info_future = executor.submit(get_dataset_info, cfg, dataset_id)
+            index_future = executor.submit(get_dataset_document_name_index, cfg, dataset_id)
+            dataset_info = info_future.result()
+            remote_name_index = index_future.result()
 
         dataset_doc_total = remote_name_index.get("total")
-        if dataset_doc_total is None:
-            dataset_doc_total = get_dataset_document_total(cfg, dataset_id)
-            remote_name_index["total"] = dataset_doc_total
         if dataset_doc_total is not None:
             task.add_event("info", "zotero_collect", "dataset_doc_total", f"dataset docs total: {dataset_doc_total}")
 
@@ -69,7 +70,7 @@ def run_pipeline(task: Task, cancel: threading.Event, skip_files: set = None):
                 f"{skipped_unhealthy} docs in Dify skipped (error/disabled), will re-process",
             )
 
-        uploaded_item_keys = {k.split("#")[0] for k in remote_name_index.get("prefixed_item_keys", set())}
+        uploaded_item_keys = {k.partition("#")[0] for k in remote_name_index.get("prefixed_item_keys", ())}
         file_map = collect_files(
             cfg,
             uploaded_item_keys=uploaded_item_keys,
@@ -84,22 +85,26 @@ def run_pipeline(task: Task, cancel: threading.Event, skip_files: set = None):
             task.finished_at = time.time()
             return
 
-        for fpath in file_map.keys():
-            task.files.append(FileState(filename=os.path.basename(fpath)))
+        # task_key -> filename / FileState, built once so status updates are O(1).
+        key_to_filename = {tkey: os.path.basename(fpath) for fpath, tkey in file_map.items()}
+        file_state_by_key = {}
+        file_state_by_name = {}
+        for (tkey, fname), fs in zip(key_to_filename.items(), task.add_files(key_to_filename.values())):
+            # Same-name files share the first FileState, as the filename lookup did before.
+            file_state_by_key[tkey] = file_state_by_name.setdefault(fname, fs)
 
         task.add_event("info", "zotero_collect", "files_collected", f"collected {len(file_map)} files")
-        _check_cancel()
+        if is_cancelled():
+            raise _CancelledError("task cancelled")
 
         # ---- Stage: MinerU Upload + Poll ----
         task.stage = Stage.MINERU_UPLOAD
         task.add_event("info", "mineru_upload", "stage_enter", "start MinerU batch parse")
 
-        from mineru_client import process_files
-
         md_results, md_failures = process_files(cfg, file_map)
 
         for key, reason in md_failures.items():
-            _update_file_status(task, key, file_map, FileStatus.FAILED, Stage.MINERU_POLL, str(reason))
+            _update_file_status(task, key, file_state_by_key, FileStatus.FAILED, Stage.MINERU_POLL, str(reason))
 
         task.add_event(
             "info",
@@ -107,7 +112,8 @@ def run_pipeline(task: Task, cancel: threading.Event, skip_files: set = None):
             "mineru_done",
             f"MinerU done: success={len(md_results)}, failed={len(md_failures)}",
         )
-        _check_cancel()
+        if is_cancelled():
+            raise _CancelledError("task cancelled")
 
         if not md_results:
             task.add_event("warn", "mineru_poll", "no_results", "no file parsed successfully")
@@ -120,24 +126,15 @@ def run_pipeline(task: Task, cancel: threading.Event, skip_files: set = None):
         task.stage = Stage.MD_CLEAN
         task.add_event("info", "md_clean", "stage_enter", "start markdown cleaning")
 
-        from md_cleaner import clean_all
-
-        key_to_filename = _build_key_to_filename(file_map)
-
         # Filter out skipped files before cleaning.
         if skip_files:
-            filtered = {}
-            skipped_clean = []
-            for key, data in md_results.items():
-                fname = key_to_filename.get(key, "")
-                if fname in skip_files:
-                    skipped_clean.append(key)
-                    _update_file_status(task, key, file_map, FileStatus.SKIPPED, Stage.MD_CLEAN, "用户手动跳过")
-                else:
-                    filtered[key] = data
+            skipped_clean = [k for k in md_results if key_to_filename.get(k, "") in skip_files]
             if skipped_clean:
+                for key in skipped_clean:
+                    _update_file_status(task, key, file_state_by_key, FileStatus.SKIPPED, Stage.MD_CLEAN, "用户手动跳过")
+                skip_keys = set(skipped_clean)
+                md_results = {k: v for k, v in md_results.items() if k not in skip_keys}
                 task.add_event("info", "md_clean", "files_skipped", f"skipped {len(skipped_clean)} files")
-            md_results = filtered
 
         if not md_results:
             task.add_event("info", "md_clean", "no_results", "no files to clean after skip")
@@ -180,7 +177,8 @@ def run_pipeline(task: Task, cancel: threading.Event, skip_files: set = None):
                     f"succeeded={succeeded}, failed={failed}, fallback={fallback}"
                 ),
             )
-        _check_cancel()
+        if is_cancelled():
+            raise _CancelledError("task cancelled")
 
         # ---- Stage: Smart Split ----
         task.stage = Stage.SMART_SPLIT
@@ -188,8 +186,6 @@ def run_pipeline(task: Task, cancel: threading.Event, skip_files: set = None):
         if smart_cfg.get("enabled", True):
             task.add_event("info", "smart_split", "stage_enter", "start smart split")
 
-            from splitter import smart_split_all
-
             md_results, split_stats = smart_split_all(md_results, cfg)
 
             task.add_event(
@@ -201,11 +197,11 @@ def run_pipeline(task: Task, cancel: threading.Event, skip_files: set = None):
         else:
             task.add_event("info", "smart_split", "skipped", "smart split disabled")
 
-        from splitter import split_documents_for_upload
-
         # Mandatory doc-level split for upload: each doc must be <= 300k chars.
         md_results, doc_split_stats = split_documents_for_upload(md_results, cfg)
         task.runtime_stats["upload_doc_split"] = doc_split_stats
+        # Resolve each (possibly split) doc key to its parent task key once.
+        item_key_to_parent = {k: _resolve_parent_task_key(md_results, k) for k in md_results}
         task.add_event(
             "info",
             "smart_split",
@@ -219,7 +215,8 @@ def run_pipeline(task: Task, cancel: threading.Event, skip_files: set = None):
                 f"hard_cuts={doc_split_stats.get('hard_cuts', 0)}"
             ),
         )
-        _check_cancel()
+        if is_cancelled():
+            raise _CancelledError("task cancelled")
 
         source_doc_count = int(doc_split_stats.get("source_files") or len(file_map))
         upload_doc_count = int(doc_split_stats.get("output_docs") or len(md_results))
@@ -235,26 +232,25 @@ def run_pipeline(task: Task, cancel: threading.Event, skip_files: set = None):
 
         # Filter out skipped files before upload (including split parts).
         if skip_files:
-            filtered = {}
-            skipped_upload = []
-            for key, data in md_results.items():
-                parent_key = _resolve_parent_task_key(md_results, key)
-                parent_fname = key_to_filename.get(parent_key, "")
-                if parent_fname in skip_files:
-                    skipped_upload.append(key)
-                else:
-                    filtered[key] = data
-            if skipped_upload:
+            # Decide once per parent, then drop every part of a skipped parent.
+            skip_parents = {
+                parent for parent in set(item_key_to_parent.values())
+                if key_to_filename.get(parent, "") in skip_files
+            }
+            if skip_parents:
+                kept = {k: v for k, v in md_results.items() if item_key_to_parent[k] not in skip_parents}
+                skipped_upload_count = len(md_results) - len(kept)
+                md_results = kept
+                item_key_to_parent = {k: item_key_to_parent[k] for k in md_results}
                 task.add_event(
                     "info", "dify_upload", "files_skipped",
-                    f"skipped {len(skipped_upload)} docs (including split parts)",
+                    f"skipped {skipped_upload_count} docs (including split parts)",
                 )
-            md_results = filtered
 
         if not md_results:
             task.add_event("info", "dify_upload", "no_results", "no files to upload after skip")
             task.stage = Stage.FINALIZE
-            skipped_count = sum(1 for f in task.files if f.status == FileStatus.SKIPPED)
+            skipped_count = task.count_files(FileStatus.SKIPPED)
             if skipped_count == len(task.files):
                 task.status = TaskStatus.SUCCEEDED
             else:
@@ -271,39 +267,45 @@ def run_pipeline(task: Task, cancel: threading.Event, skip_files: set = None):
         # Force Dify segment separator when smart split is enabled.
         effective_cfg = cfg
         if smart_cfg.get("enabled", True):
-            import json
-
-            effective_cfg = json.loads(json.dumps(cfg))
+            # Only the dify section changes; copy it shallowly instead of deep-copying cfg.
             marker = smart_cfg.get("split_marker", "<!--split-->")
-            effective_cfg["dify"]["segment_separator"] = marker
-
-        from dify_client import upload_all
+            effective_cfg = dict(cfg)
+            effective_cfg["dify"] = {**cfg.get("dify", {}), "segment_separator": marker}
 
-        parent_part_totals = _build_parent_part_totals(md_results)
-        parent_submit_ok_counts = defaultdict(int)
+        parent_part_totals = _build_parent_part_totals(item_key_to_parent)
+        parent_to_name = _build_parent_to_name(md_results, item_key_to_parent)
+        parts_remaining = dict(parent_part_totals)
         parent_failures = set()
 
         def _on_dify_progress(payload: dict):
             phase = (payload or {}).get("phase", "")
             item_key = (payload or {}).get("item_key", "")
             message = (payload or {}).get("message", "")
-            parent_key = _resolve_parent_task_key(md_results, item_key) if item_key else ""
+            parent_key = _lookup_parent_task_key(item_key_to_parent, item_key)
 
-            # Ignore progress for skipped files.
-            if parent_key:
-                parent_fname = key_to_filename.get(parent_key, "")
-                if parent_fname in skip_files:
-                    return
+            # Ignore progress for skipped files. skip_files is the live set the task
+            # manager mutates, so it is re-read per event rather than snapshotted.
+            if skip_files and parent_key and key_to_filename.get(parent_key, "") in skip_files:
+                return
 
             if phase == "submit_ok":
-                if parent_key:
-                    parent_submit_ok_counts[parent_key] += 1
-                    expected_parts = int(parent_part_totals.get(parent_key, 1))
-                    if (
-                        parent_key not in parent_failures
-                        and parent_submit_ok_counts[parent_key] >= expected_parts
-                    ):
-                        _update_file_status(task, parent_key, file_map, FileStatus.SUCCEEDED, Stage.DIFY_UPLOAD)
+                if not parent_key:
+                    task.add_event("info", "dify_upload", "file_submitted", message or f"submitted to Dify: {item_key}")
+                    return
+                remaining = parts_remaining.get(parent_key, 1) - 1
+                parts_remaining[parent_key] = remaining
+                # One event per source file: split parts are counted down silently
+                # and reported once, on the transition to fully submitted.
+                if remaining != 0:
+                    return
+                if parent_key not in parent_failures:
+                    _update_file_status(task, parent_key, file_state_by_key, FileStatus.SUCCEEDED, Stage.DIFY_UPLOAD)
+                total_parts = parent_part_totals.get(parent_key, 1)
+                if total_parts > 1:
+                    message = (
+                        f"Dify submit accepted: {parent_to_name.get(parent_key, parent_key)} "
+                        f"({total_parts} parts)"
+                    )
                 task.add_event("info", "dify_upload", "file_submitted", message or f"submitted to Dify: {item_key}")
                 return
 
@@ -313,7 +315,7 @@ def run_pipeline(task: Task, cancel: threading.Event, skip_files: set = None):
                     _update_file_status(
                         task,
                         parent_key,
-                        file_map,
+                        file_state_by_key,
                         FileStatus.FAILED,
                         Stage.DIFY_UPLOAD,
                         message or "Dify submit failed",
@@ -327,23 +329,26 @@ def run_pipeline(task: Task, cancel: threading.Event, skip_files: set = None):
             md_results,
             dataset_info=dataset_info,
             progress_callback=_on_dify_progress,
+            should_cancel=is_cancelled,
         )
+        if is_cancelled():
+            raise _CancelledError("task cancelled")
 
         uploaded_parent_keys, failed_parent_keys = _aggregate_parent_upload_outcomes(
             uploaded_keys,
             upload_failures,
-            md_results,
+            item_key_to_parent,
             parent_part_totals,
         )
 
-        for key in sorted(uploaded_parent_keys):
-            _update_file_status(task, key, file_map, FileStatus.SUCCEEDED, Stage.DIFY_UPLOAD)
+        for key in uploaded_parent_keys:
+            _update_file_status(task, key, file_state_by_key, FileStatus.SUCCEEDED, Stage.DIFY_UPLOAD)
 
-        for key in sorted(failed_parent_keys):
+        for key in failed_parent_keys:
             _update_file_status(
                 task,
                 key,
-                file_map,
+                file_state_by_key,
                 FileStatus.FAILED,
                 Stage.DIFY_UPLOAD,
                 "upload failed",
@@ -365,7 +370,7 @@ def run_pipeline(task: Task, cancel: threading.Event, skip_files: set = None):
 
         # ---- Finalize ----
         task.stage = Stage.FINALIZE
-        skipped_count = sum(1 for f in task.files if f.status == FileStatus.SKIPPED)
+        skipped_count = task.count_files(FileStatus.SKIPPED)
         total_failed = len(md_failures) + len(failed_parent_keys)
         if total_failed == 0:
             task.status = TaskStatus.SUCCEEDED
@@ -410,64 +415,70 @@ def _resolve_parent_task_key(md_results: dict, item_key: str) -> str:
     if isinstance(data, dict):
         parent = str(data.get("parent_task_key") or "")
     base = parent or str(item_key or "")
-    return base.split("#", 1)[0]
+    return base.partition("#")[0]
+
 
+def _lookup_parent_task_key(item_key_to_parent: dict[str, str], item_key: str) -> str:
+    """Parent key from the precomputed map; unknown keys resolve as _resolve_parent_task_key would."""
+    parent = item_key_to_parent.get(item_key)
+    if parent is None:
+        parent = str(item_key or "").partition("#")[0]
+    return parent
 
-def _build_parent_part_totals(md_results: dict) -> dict[str, int]:
-    totals = defaultdict(int)
-    for item_key in (md_results or {}).keys():
-        parent_key = _resolve_parent_task_key(md_results, item_key)
-        if parent_key:
-            totals[parent_key] += 1
-    return dict(totals)
 
+def _build_parent_part_totals(item_key_to_parent: dict[str, str]) -> dict[str, int]:
+    totals = Counter(item_key_to_parent.values())
+    totals.pop("", None)
+    return totals
 
-def _resolve_parent_file_name(md_results: dict, parent_key: str) -> str:
+
+def _build_parent_to_name(md_results: dict, item_key_to_parent: dict[str, str]) -> dict[str, str]:
+    """Map each parent key to its display name in one pass.
+
+    Takes the first part (in md_results order) carrying a name, preferring
+    source_file_name over file_name; parents without any name map to themselves.
+    """
+    parent_to_name = {}
     for item_key, data in (md_results or {}).items():
-        if _resolve_parent_task_key(md_results, item_key) != parent_key:
+        parent_key = _lookup_parent_task_key(item_key_to_parent, item_key)
+        if parent_to_name.get(parent_key):
             continue
+        name = ""
         if isinstance(data, dict):
-            source_name = str(data.get("source_file_name") or "").strip()
-            if source_name:
-                return source_name
-            file_name = str(data.get("file_name") or "").strip()
-            if file_name:
-                return file_name
-    return parent_key
+            name = str(data.get("source_file_name") or "").strip() or str(data.get("file_name") or "").strip()
+        parent_to_name[parent_key] = name
+    return {parent: name or parent for parent, name in parent_to_name.items()}
 
 
 def _aggregate_parent_upload_outcomes(
     uploaded_keys: list[str],
     failed_keys: list[str],
-    md_results: dict,
+    item_key_to_parent: dict[str, str],
     parent_part_totals: dict[str, int],
 ) -> tuple[set[str], set[str]]:
-    uploaded_parts = defaultdict(set)
-    failed_parents = set()
-
-    for key in uploaded_keys or []:
-        parent = _resolve_parent_task_key(md_results, key)
-        if parent:
-            uploaded_parts[parent].add(key)
-
-    for key in failed_keys or []:
-        parent = _resolve_parent_task_key(md_results, key)
-        if parent:
-            failed_parents.add(parent)
-
-    candidate_parents = set(parent_part_totals.keys())
-    candidate_parents.update(uploaded_parts.keys())
-    candidate_parents.update(failed_parents)
+    # upload_all reports each doc key once; dedupe anyway so counts match the old per-parent sets.
+    uploaded_counts = Counter(
+        parent
+        for parent in (_lookup_parent_task_key(item_key_to_parent, k) for k in set(uploaded_keys or ()))
+        if parent
+    )
+    failed_parents = {
+        parent
+        for parent in (_lookup_parent_task_key(item_key_to_parent, k) for k in failed_keys or ())
+        if parent
+    }
 
     succeeded = set()
-    for parent in candidate_parents:
+    for parent, total in parent_part_totals.items():
         if parent in failed_parents:
             continue
-        expected_parts = int(parent_part_totals.get(parent, 1))
-        if len(uploaded_parts.get(parent, set())) >= expected_parts:
+        if uploaded_counts.get(parent, 0) >= total:
             succeeded.add(parent)
         else:
             failed_parents.add(parent)
+    # Parents uploaded but absent from the totals count as single-part documents.
+    for parent in uploaded_counts.keys() - parent_part_totals.keys() - failed_parents:
+        succeeded.add(parent)
 
     return succeeded, failed_parents
 
@@ -475,32 +486,17 @@ def _aggregate_parent_upload_outcomes(
 def _update_file_status(
     task: Task,
     key: str,
-    file_map: dict,
+    file_state_by_key: dict,
     status: FileStatus,
     stage: Stage,
     error: str = "",
 ):
     """Update FileState by task key."""
-    filename = None
-    for fpath, tkey in file_map.items():
-        if tkey == key:
-            filename = os.path.basename(fpath)
-            break
-    if filename is None:
+    fs = file_state_by_key.get(key)
+    if fs is None:
         return
-
-    for fs in task.files:
-        if fs.filename == filename:
-            fs.status = status
-            fs.stage = stage
-            fs.error = error
-            break
-
-
-def _build_key_to_filename(file_map: dict) -> dict[str, str]:
-    """Build task_key -> filename mapping."""
-    return {tkey: os.path.basename(fpath) for fpath, tkey in file_map.items()}
+    task.set_file_status(fs, status, stage, error)
 
 
-class _CancelledError(Exception):
-    pass
+class _CancelledError(BaseException):
+    """Raised on cancellation; a BaseException so broad ``except Exception`` handlers let it through."""
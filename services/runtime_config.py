@@ -5,11 +5,17 @@ import os
 import tempfile
 import threading
 
+try:
+    import orjson
+except ImportError:  # 可选依赖，缺失时回退到标准库 json
+    orjson = None
+
 from services.config_schema import (
     CONFIG_SCHEMA,
     ENV_KEY_MAP,
     build_defaults,
     validate_and_coerce,
+    validate_patch,
     mask_sensitive,
 )
 
@@ -20,6 +26,11 @@ _DEFAULT_CONFIG_PATH = os.path.join(
 )
 
 
+def _copy_config(data: dict) -> dict:
+    """按 category 复制配置；校验后的字段值均为标量，两层复制即为深拷贝。"""
+    return {category: dict(fields) for category, fields in data.items()}
+
+
 class RuntimeConfigProvider:
     """线程安全的运行时配置提供者。
 
@@ -34,6 +45,7 @@ class RuntimeConfigProvider:
         self._lock = threading.RLock()
         self._data: dict = {}
         self._version: int = 0
+        self._masked_cache: tuple[int, dict] | None = None
         self._ensure_dir()
         self._load_or_init()
 
@@ -42,7 +54,7 @@ class RuntimeConfigProvider:
     def get_snapshot(self) -> dict:
         """返回当前配置的深拷贝快照。"""
         with self._lock:
-            return json.loads(json.dumps(self._data))
+            return _copy_config(self._data)
 
     def get_version(self) -> int:
         """返回当前配置版本号。"""
@@ -59,13 +71,11 @@ class RuntimeConfigProvider:
             脱敏后的完整配置。
         """
         with self._lock:
-            merged = json.loads(json.dumps(self._data))
-            current_masked = mask_sensitive(self._data)
+            current_masked = self._masked()
+            accepted: dict = {}
             for category, fields in patch.items():
                 if not isinstance(fields, dict):
                     continue
-                if category not in merged:
-                    merged[category] = {}
                 schema_fields = CONFIG_SCHEMA.get(category, {})
                 for key, value in fields.items():
                     spec = schema_fields.get(key, {})
@@ -74,12 +84,13 @@ class RuntimeConfigProvider:
                         masked_existing = (current_masked.get(category, {}) or {}).get(key)
                         if isinstance(masked_existing, str) and value == masked_existing:
                             continue
-                    merged[category][key] = value
-            validated = validate_and_coerce(merged)
+                    accepted.setdefault(category, {})[key] = value
+            # self._data 已经过完整校验，只需转换本次修改的字段。
+            validated = validate_patch(self._data, accepted)
             self._data = validated
             self._version += 1
             self._save()
-            return mask_sensitive(self._data)
+            return _copy_config(self._masked())
 
     def import_env(self, env_path: str = ".env") -> dict:
         """从 .env 文件导入配置值，覆盖现有同名项。
@@ -99,12 +110,12 @@ class RuntimeConfigProvider:
             patch[category][key] = value
         if patch:
             return self.update(patch)
-        return mask_sensitive(self.get_snapshot())
+        return self.get_masked()
 
     def get_masked(self) -> dict:
         """返回脱敏后的配置快照。"""
         with self._lock:
-            return mask_sensitive(self._data)
+            return _copy_config(self._masked())
 
     def reset_to_defaults(self) -> dict:
         """重置为默认配置，版本 +1。"""
@@ -112,10 +123,17 @@ class RuntimeConfigProvider:
             self._data = build_defaults()
             self._version += 1
             self._save()
-            return mask_sensitive(self._data)
+            return _copy_config(self._masked())
 
     # ------ internal ------
 
+    def _masked(self) -> dict:
+        """按版本号缓存的脱敏配置；须在持有锁时调用，调用方不得修改返回值。"""
+        cache = self._masked_cache
+        if cache is None or cache[0] != self._version:
+            cache = self._masked_cache = (self._version, mask_sensitive(self._data))
+        return cache[1]
+
     def _ensure_dir(self):
         os.makedirs(os.path.dirname(self._path), exist_ok=True)
 
@@ -148,7 +166,7 @@ class RuntimeConfigProvider:
                     patch[category] = {}
                 patch[category][key] = value
             if patch:
-                merged = json.loads(json.dumps(self._data))
+                merged = _copy_config(self._data)
                 for cat, fields in patch.items():
                     if cat not in merged:
                         merged[cat] = {}
@@ -166,8 +184,12 @@ class RuntimeConfigProvider:
         dir_name = os.path.dirname(self._path)
         try:
             fd, tmp_path = tempfile.mkstemp(dir=dir_name, suffix=".tmp")
-            with os.fdopen(fd, "w", encoding="utf-8") as f:
-                json.dump(payload, f, ensure_ascii=False, indent=2)
+            if orjson is not None:
+                with os.fdopen(fd, "wb") as f:
+                    f.write(orjson.dumps(payload, option=orjson.OPT_INDENT_2))
+            else:
+                with os.fdopen(fd, "w", encoding="utf-8") as f:
+                    json.dump(payload, f, ensure_ascii=False, indent=2)
             # Windows: os.rename 不能覆盖已存在文件，用 os.replace
             os.replace(tmp_path, self._path)
         except OSError:
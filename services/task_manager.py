@@ -128,8 +128,7 @@ class TaskManager:
             if target_fs.status in (FileStatus.SUCCEEDED, FileStatus.FAILED, FileStatus.SKIPPED):
                 return {"ok": False, "reason": f"文件已处于终态: {target_fs.status.value}"}
 
-            target_fs.status = FileStatus.SKIPPED
-            target_fs.error = "用户手动跳过"
+            task.set_file_status(target_fs, FileStatus.SKIPPED, error="用户手动跳过")
 
             skip_set = self._skip_files.get(task_id)
             if skip_set is None:
@@ -153,9 +152,9 @@ class TaskManager:
             task = self._tasks.get(task_id)
             if task is None:
                 return []
-            return [
-                e.to_dict() for e in task.events if e.seq > after_seq
-            ]
+            # 流水线线程会并发 append；先做原子拷贝，避免 deque 迭代期间被修改。
+            events = list(task.events)
+        return [e.to_dict() for e in events if e.seq > after_seq]
 
     def get_files(self, task_id: str) -> list[dict]:
         with self._lock:
@@ -41,5 +41,7 @@ const Api = {
     checkMinerU() { return this.request('GET', '/mineru/health'); },
     checkDify() { return this.request('GET', '/dify/health'); },
     checkImageSummary() { return this.request('GET', '/image-summary/health'); },
-    getCollections() { return this.request('GET', '/zotero/collections'); },
+    getCollections(refresh = false) {
+        return this.request('GET', refresh ? '/zotero/collections?refresh=1' : '/zotero/collections');
+    },
 };
@@ -63,14 +63,15 @@ const Dashboard = {
     async openZoteroSelection() {
         const modal = new bootstrap.Modal(document.getElementById('zotero-collection-modal'));
         modal.show();
-        await this.loadZoteroCollections();
+        // 显式打开选择器时绕过服务端缓存，确保新建分组立即可见。
+        await this.loadZoteroCollections(true);
     },
 
-    async loadZoteroCollections() {
+    async loadZoteroCollections(refresh = false) {
         const container = document.getElementById('zotero-collection-list');
         container.innerHTML = '<div class="text-center text-muted py-3">加载中...</div>';
         try {
-            const resp = await Api.getCollections();
+            const resp = await Api.getCollections(refresh);
             const collections = resp.data || [];
             if (collections.length === 0) {
                 container.innerHTML = '<div class="text-center text-muted py-3">未找到分组或连接失败</div>';
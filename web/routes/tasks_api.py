@@ -1,6 +1,8 @@
 """任务管理 API 路由。"""
 
-from flask import Blueprint, jsonify, request
+import json
+
+from flask import Blueprint, Response, jsonify, request
 
 from web.errors import error_response, not_found
 
@@ -11,6 +13,9 @@ _task_manager = None
 _config_provider = None
 _pipeline_runner_fn = None
 
+# 文件数超过该阈值时，任务详情改为流式输出，避免整块构建响应体。
+_STREAM_FILES_THRESHOLD = 1000
+
 
 def init_tasks_routes(task_manager, config_provider, pipeline_runner_fn):
     global _task_manager, _config_provider, _pipeline_runner_fn
@@ -19,6 +24,27 @@ def init_tasks_routes(task_manager, config_provider, pipeline_runner_fn):
     _pipeline_runner_fn = pipeline_runner_fn
 
 
+def _iter_task_detail_json(detail: dict):
+    """将 detail_stream() 的结果逐文件编码为 JSON 片段。"""
+    files = detail.pop("files")
+    head = json.dumps({"success": True, "data": detail})
+    # head 以 "}}" 结尾：去掉后补上 files 数组，再闭合 data 与外层对象。
+    yield head[:-2] + ', "files": ['
+    first = True
+    for item in files:
+        yield json.dumps(item) if first else "," + json.dumps(item)
+        first = False
+    yield "]}}"
+
+
+def _parse_collection_keys(raw: str) -> list[str]:
+    """解析逗号分隔的分组 Key，每段只 strip 一次。"""
+    if "," not in raw:
+        key = raw.strip()
+        return [key] if key else []
+    return [key for part in raw.split(",") if (key := part.strip())]
+
+
 @tasks_bp.route("/tasks", methods=["POST"])
 def create_task():
     """创建新任务。"""
@@ -26,7 +52,7 @@ def create_task():
     collection_keys = body.get("collection_keys", [])
 
     if isinstance(collection_keys, str):
-        collection_keys = [k.strip() for k in collection_keys.split(",") if k.strip()]
+        collection_keys = _parse_collection_keys(collection_keys)
 
     config_snapshot = _config_provider.get_snapshot()
     config_version = _config_provider.get_version()
@@ -58,6 +84,11 @@ def get_task(task_id):
     task = _task_manager.get_task(task_id)
     if task is None:
         return not_found("任务不存在")
+    if len(task.files) > _STREAM_FILES_THRESHOLD:
+        return Response(
+            _iter_task_detail_json(task.detail_stream()),
+            mimetype="application/json",
+        )
     return jsonify({"success": True, "data": task.detail()})
 
 
@@ -1,6 +1,6 @@
 """Zotero 相关 API 路由。"""
 
-from flask import Blueprint, jsonify
+from flask import Blueprint, jsonify, request
 
 from web.errors import error_response
 
@@ -30,11 +30,12 @@ def zotero_health():
 
 @zotero_bp.route("/zotero/collections", methods=["GET"])
 def zotero_collections():
-    """获取 Zotero 分组树。"""
+    """获取 Zotero 分组树（短时缓存，?refresh=1 强制刷新）。"""
     cfg = _config_provider.get_snapshot()
+    refresh = request.args.get("refresh", "").strip().lower() in ("1", "true", "yes")
     try:
         from zotero_client import list_collections
-        collections = list_collections(cfg)
+        collections = list_collections(cfg, use_cache=not refresh)
         return jsonify({"success": True, "data": collections})
     except Exception as exc:
         return error_response(f"获取分组失败: {exc}", 500)
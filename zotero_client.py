@@ -1,15 +1,59 @@
+from concurrent.futures import ThreadPoolExecutor
 import json
 import logging
 import os
+import threading
+import time
 from collections import deque
 
 import requests
 
+from http_session import build_session
+
 logger = logging.getLogger(__name__)
 
 SUPPORTED_FORMATS = {".pdf", ".doc", ".docx", ".ppt", ".pptx", ".png", ".jpg", ".jpeg"}
 
 MAX_PAGES_GUARD = 500  # 防止分页死循环
+COLLECTIONS_CACHE_TTL_S = 60
+DEFAULT_DETAIL_CONCURRENCY = 4
+COLLECTION_PAGE_WORKERS = 4
+
+_collections_cache = {}  # (mcp_url, mode, page_size) -> (expires_at, collections)
+_collections_cache_lock = threading.Lock()
+# MCP 调用均为只读 JSON-RPC，可安全重放；服务端限流（429/503）时由传输层退避重试。
+_SESSION = build_session(retry_methods=("GET", "HEAD", "POST"), status_forcelist=(429, 503))
+
+
+class _TokenBucket:
+    """客户端限速：按 rps 平滑发出请求，rps <= 0 表示不限速。"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._next_ok = 0.0
+        self.rps = 0.0
+
+    def acquire(self):
+        rps = self.rps
+        if rps <= 0:
+            return
+        with self._lock:
+            now = time.monotonic()
+            wait = max(0.0, self._next_ok - now)
+            self._next_ok = max(now, self._next_ok) + 1.0 / rps
+        if wait:
+            time.sleep(wait)
+
+
+_RATE_LIMITER = _TokenBucket()
+
+
+def _apply_rate_limit(cfg):
+    raw = cfg.get("zotero", {}).get("rps", 0)
+    try:
+        _RATE_LIMITER.rps = max(0.0, float(raw))
+    except (TypeError, ValueError):
+        _RATE_LIMITER.rps = 0.0
 
 
 def _mcp_call(method, mcp_url, params=None):
@@ -22,7 +66,8 @@ def _mcp_call(method, mcp_url, params=None):
     if params is not None:
         payload["params"] = params
 
-    resp = requests.post(mcp_url, json=payload, timeout=30)
+    _RATE_LIMITER.acquire()
+    resp = _SESSION.post(mcp_url, json=payload, timeout=30)
     resp.raise_for_status()
     body = resp.json()
 
@@ -60,8 +105,10 @@ def _parse_mcp_content(result):
 def check_connection(cfg):
     """Verify the Zotero MCP server is reachable."""
     mcp_url = cfg["zotero"]["mcp_url"]
+    _apply_rate_limit(cfg)
     try:
-        resp = requests.post(
+        _RATE_LIMITER.acquire()
+        resp = _SESSION.post(
             mcp_url,
             json={"jsonrpc": "2.0", "id": 0, "method": "tools/list"},
             timeout=5,
@@ -85,28 +132,82 @@ def _extract_list_payload(data, candidate_keys=("results", "items", "collections
     return []
 
 
-def list_collections(cfg, mode="standard", page_size=100):
-    """Fetch all collections from Zotero, handling pagination."""
+def clear_collections_cache():
+    """Drop cached list_collections results."""
+    with _collections_cache_lock:
+        _collections_cache.clear()
+
+
+def list_collections(cfg, mode="standard", page_size=100, use_cache=True):
+    """Fetch all collections from Zotero, handling pagination.
+
+    Results are cached per (mcp_url, mode, page_size) for
+    cfg["zotero"]["collections_cache_ttl_s"] seconds (default
+    COLLECTIONS_CACHE_TTL_S, 0 disables); pass use_cache=False to force a refetch.
+    Empty listings are not cached, so a Zotero outage does not stick.
+    """
     mcp_url = cfg["zotero"]["mcp_url"]
-    all_collections = []
-    offset = 0
-    page_size = max(1, page_size)
-    for _ in range(MAX_PAGES_GUARD):
-        result = _mcp_call(
-            "tools/call",
-            mcp_url,
-            {"name": "get_collections", "arguments": {"mode": mode, "limit": page_size, "offset": offset}},
+    _apply_rate_limit(cfg)
+    cache_key = (mcp_url, mode, page_size)
+    try:
+        ttl = max(0, int(cfg["zotero"].get("collections_cache_ttl_s", COLLECTIONS_CACHE_TTL_S)))
+    except (TypeError, ValueError):
+        ttl = COLLECTIONS_CACHE_TTL_S
+    if ttl <= 0:
+        return _fetch_collections(mcp_url, mode, page_size)
+
+    if use_cache:
+        with _collections_cache_lock:
+            cached = _collections_cache.get(cache_key)
+        if cached is not None and cached[0] > time.monotonic():
+            return list(cached[1])
+
+    all_collections = _fetch_collections(mcp_url, mode, page_size)
+    if not all_collections:
+        return []
+    with _collections_cache_lock:
+        _collections_cache[cache_key] = (
+            time.monotonic() + ttl,
+            all_collections,
         )
-        data = _parse_mcp_content(result)
-        items = _extract_list_payload(data)
-        if not items:
-            break
-        all_collections.extend(items)
-        if len(items) < page_size:
-            break
-        offset += page_size
-    else:
-        logger.warning("list_collections 命中分页保护上限（%d 页），结果可能不完整", MAX_PAGES_GUARD)
+    return list(all_collections)
+
+
+def _fetch_collection_page(mcp_url, mode, page_size, offset):
+    result = _mcp_call(
+        "tools/call",
+        mcp_url,
+        {"name": "get_collections", "arguments": {"mode": mode, "limit": page_size, "offset": offset}},
+    )
+    return _extract_list_payload(_parse_mcp_content(result))
+
+
+def _fetch_collections(mcp_url, mode, page_size):
+    """分页拉取全部分组。
+
+    get_collections 不返回总数，首页满页后按窗口预取后续页
+    （COLLECTION_PAGE_WORKERS 页并发），遇到空页或不满页即停止。
+    """
+    page_size = max(1, page_size)
+    all_collections = _fetch_collection_page(mcp_url, mode, page_size, 0)
+    if len(all_collections) < page_size:
+        return all_collections
+
+    next_page = 1
+    with ThreadPoolExecutor(max_workers=COLLECTION_PAGE_WORKERS) as executor:
+        while next_page < MAX_PAGES_GUARD:
+            window = range(next_page, min(next_page + COLLECTION_PAGE_WORKERS, MAX_PAGES_GUARD))
+            pages = executor.map(
+                lambda p: _fetch_collection_page(mcp_url, mode, page_size, p * page_size),
+                window,
+            )
+            for items in pages:
+                all_collections.extend(items)
+                if len(items) < page_size:
+                    return all_collections
+            next_page = window.stop
+
+    logger.warning("list_collections 命中分页保护上限（%d 页），结果可能不完整", MAX_PAGES_GUARD)
     return all_collections
 
 
@@ -290,6 +391,15 @@ def get_attachment_paths(mcp_url, item_key):
     return paths
 
 
+def _resolve_detail_concurrency(cfg, item_count):
+    raw = cfg.get("zotero", {}).get("detail_concurrency", DEFAULT_DETAIL_CONCURRENCY)
+    try:
+        workers = int(raw)
+    except (TypeError, ValueError):
+        workers = DEFAULT_DETAIL_CONCURRENCY
+    return max(1, min(workers, 16, item_count or 1))
+
+
 def collect_files(
     cfg,
     uploaded_item_keys=None,
@@ -310,6 +420,7 @@ def collect_files(
         dict: {file_path: task_key} where task_key = "item_key#index"
     """
     mcp_url = cfg["zotero"]["mcp_url"]
+    _apply_rate_limit(cfg)
 
     if uploaded_item_keys is None:
         uploaded_item_keys = set()
@@ -321,6 +432,7 @@ def collect_files(
     file_map = {}
     seen_paths = set()
     skipped_processed = 0
+    pending_keys = []
 
     for item in items:
         item_key = item.get("key", "") if isinstance(item, dict) else str(item)
@@ -332,10 +444,25 @@ def collect_files(
             skipped_processed += 1
             continue
 
+        pending_keys.append(item_key)
+
+    def _lookup(item_key):
         try:
-            paths = get_attachment_paths(mcp_url, item_key)
+            return get_attachment_paths(mcp_url, item_key)
         except Exception as exc:
             logger.warning("获取条目附件失败：%s，错误=%s", item_key, exc)
+            return None
+
+    # 附件详情查询与磁盘存在性检查均为阻塞 I/O，用有界线程池重叠等待；map 保持条目顺序。
+    workers = _resolve_detail_concurrency(cfg, len(pending_keys))
+    if workers > 1:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            path_lists = list(executor.map(_lookup, pending_keys))
+    else:
+        path_lists = [_lookup(k) for k in pending_keys]
+
+    for item_key, paths in zip(pending_keys, path_lists):
+        if paths is None:
             continue
 
         paths = sorted(paths)